@@ -1,15 +1,23 @@
 # src/oculith/common.py
 import os
 import tempfile
-import base64
 import re
 from pathlib import Path
 import logging
 from typing import Optional
+
+try:
+    import pybase64 as base64  # 可选依赖，SIMD加速的Base64编解码，接口与标准库一致
+except ImportError:
+    import base64
+
 from .file_utils import detect_file_type, is_image_file, convert_image_to_pdf
 
 logger = logging.getLogger(__name__)
 
+# URL下载时每次读取并写入临时文件的字节数
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
 def is_base64(content: str) -> bool:
     """简单判断是否为Base64字符串"""
     if not re.match(r'^[A-Za-z0-9+/]+={0,2}$', content):
@@ -43,8 +51,11 @@ def convert_file(
                 tmp_path = tmp.name
             return converter.convert(tmp_path)
         finally:
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
 
     # 本地文件直接转换
     if os.path.exists(content):
@@ -114,7 +125,7 @@ def prepare_file(content: str, content_type: str = "auto", file_type: str = "")
             with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
                 response = requests.get(content, stream=True)
                 response.raise_for_status()
-                for chunk in response.iter_content(chunk_size=8192):
+                for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
                     tmp.write(chunk)
                 temp_file_path = tmp.name
                 is_temp_file = True
@@ -128,8 +139,10 @@ def prepare_file(content: str, content_type: str = "auto", file_type: str = "")
                 logger.info(f"检测到图片文件: {temp_file_path}，将自动转换为PDF")
                 pdf_path, _ = convert_image_to_pdf(temp_file_path)
                 # 删除原临时文件，使用转换后的PDF
-                if os.path.exists(temp_file_path):
+                try:
                     os.unlink(temp_file_path)
+                except FileNotFoundError:
+                    pass
                 temp_file_path = pdf_path
                 detected_type = "pdf"
                 is_converted_from_image = True
@@ -139,7 +152,6 @@ def prepare_file(content: str, content_type: str = "auto", file_type: str = "")
         # Base64处理
         if content_type == 'base64' or (content_type == 'auto' and is_base64(content)):
             import tempfile
-            import base64
             
             # 使用指定的文件类型或空
             detected_type = file_type
@@ -161,8 +173,10 @@ def prepare_file(content: str, content_type: str = "auto", file_type: str = "")
                 logger.info(f"检测到图片文件: {temp_file_path}，将自动转换为PDF")
                 pdf_path, _ = convert_image_to_pdf(temp_file_path)
                 # 删除原临时文件，使用转换后的PDF
-                if os.path.exists(temp_file_path):
+                try:
                     os.unlink(temp_file_path)
+                except FileNotFoundError:
+                    pass
                 temp_file_path = pdf_path
                 detected_type = "pdf"
                 is_converted_from_image = True
@@ -174,9 +188,9 @@ def prepare_file(content: str, content_type: str = "auto", file_type: str = "")
         
     except Exception as e:
         # 出错时清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path) and is_temp_file:
+        if temp_file_path and is_temp_file:
             try:
                 os.unlink(temp_file_path)
-            except:
+            except OSError:
                 pass
         raise
\ No newline at end of file
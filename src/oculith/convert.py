@@ -1,35 +1,119 @@
+from __future__ import annotations
+
 import os
 import sys
+import shutil
+import subprocess
+import tempfile
 import hashlib
+import functools
+import inspect
+import contextlib
+import dataclasses
+import traceback
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional, Union, Literal
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union, Literal
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
-import base64
-from docling_core.types.doc import ImageRefMode, PictureItem
 import io
 import time
-from pypdf import PdfReader
 
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import (
-    PdfPipelineOptions, VlmPipelineOptions, ApiVlmOptions, ResponseFormat,
-    RapidOcrOptions, TesseractCliOcrOptions, OcrMacOptions, EasyOcrOptions,
-    PictureDescriptionApiOptions
-)
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.pipeline.vlm_pipeline import VlmPipeline
+try:
+    import blake3  # 可选依赖，SIMD并行哈希，大体积Base64内容更快
+except ImportError:
+    blake3 = None
 
+try:
+    import orjson  # 可选依赖，加速任务结果（含大量base64图片）的JSON序列化
+except ImportError:
+    orjson = None
+
+from pydantic import BaseModel
 from voidrail import create_app
 
-from .common import convert_file, prepare_file
-from .vlm_config import get_vlm_pipeline_options
+from .common import base64, convert_file, prepare_file
+
+# docling/pypdfium2等重量级模块在实际使用时才导入，降低worker启动耗时和内存占用
+if TYPE_CHECKING:
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.document_converter import DocumentConverter
 
 logger = logging.getLogger(__name__)
 
 # 创建Celery应用
 app = create_app("docling")
 
+if orjson is not None:
+    from kombu.serialization import register
+    from kombu.utils.json import loads as _json_loads
+    
+    # 仍以application/json发送，客户端无需安装orjson；解码沿用kombu自带实现
+    register(
+        "orjson",
+        functools.partial(orjson.dumps, default=str),
+        _json_loads,
+        content_type="application/json",
+        content_encoding="utf-8",
+    )
+    app.conf.result_serializer = "orjson"
+
+# 计算文档ID时每次送入哈希的字符数
+_HASH_CHUNK_SIZE = 1 << 20
+
+# 转换器缓存：配置 -> DocumentConverter（内部持有已加载的模型）
+# 同一转换器会被进程内的所有任务共用，而DocumentConverter并非线程安全，
+# 因此worker须使用prefork进程池（每个子进程一次只执行一个任务）
+_CONVERTER_CACHE: OrderedDict[tuple, DocumentConverter] = OrderedDict()
+_CONVERTER_CACHE_SIZE = 8
+_CONVERTER_CACHE_LOCK = threading.Lock()
+
+# PNG编码的zlib压缩级别（PIL默认6），1级编码速度快数倍，体积略大
+_PNG_COMPRESS_LEVEL = 1
+
+def _env_positive_int(name: str, default: int) -> int:
+    """读取正整数环境变量，取值无效时记录警告并使用默认值"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        logger.warning(f"环境变量 {name}={value!r} 无效，应为正整数，使用默认值 {default}")
+        return default
+    return number
+
+# VLM图片描述的最大并发请求数
+_VLM_DESCRIPTION_CONCURRENCY = _env_positive_int("OCULITH_VLM_CONCURRENCY", 10)
+
+# 各VLM提供商的默认模型
+_VLM_DEFAULT_MODELS = {
+    "ollama": "granite3.2-vision:2b",
+    "dashscope": "qwen-vl-plus",
+    "openai": "gpt-4o",
+}
+_VLM_ENV_KEYS = ("VLM_PROVIDER", "VLM_MODEL_NAME", "VLM_PROMPT", "VLM_API_KEY")
+
+# 参与转换结果缓存键的转换参数
+_CACHE_OPTION_KEYS = (
+    "content_type", "file_type", "pipeline", "ocr", "language", "return_base64_images",
+    "images_scale", "generate_images", "advanced_features", "output_dir",
+    "enable_vlm_picture_description", "vlm_provider", "vlm_model", "vlm_prompt",
+)
+
+# generate_images 取值 -> (generate_page_images, generate_picture_images)
+_GENERATE_IMAGES_OPTIONS = {
+    "none": (False, False),
+    "page": (True, False),
+    "picture": (False, True),
+    "all": (True, True),
+}
+
 @app.task(name="docling.convert")
 def convert(
     content: str,
@@ -48,6 +132,7 @@ def convert(
     vlm_provider: Optional[str] = None,
     vlm_model: Optional[str] = None,
     vlm_prompt: Optional[str] = None,
+    force_convert: bool = False,
 ) -> Dict[str, Any]:
     """统一的文档转换入口
     
@@ -68,176 +153,156 @@ def convert(
         vlm_provider: VLM提供商(dashscope, ollama, openai, huggingface)
         vlm_model: VLM模型名称
         vlm_prompt: VLM提示词
+        force_convert: 是否忽略结果缓存强制重新转换(配置OCULITH_CACHE_DIR时启用缓存)
     """
-    model_info = {
-        "pipeline": pipeline,
-        "provider": None,
-        "model": None,
-        "ocr_engine": ocr,
-        "vlm_enabled": enable_vlm_picture_description,
-    }
+    return _convert_document(
+        content=content,
+        content_type=content_type,
+        file_type=file_type,
+        document_id=document_id,
+        pipeline=pipeline,
+        ocr=ocr,
+        language=language,
+        return_base64_images=return_base64_images,
+        images_scale=images_scale,
+        generate_images=generate_images,
+        advanced_features=advanced_features,
+        output_dir=output_dir,
+        enable_vlm_picture_description=enable_vlm_picture_description,
+        vlm_provider=vlm_provider,
+        vlm_model=vlm_model,
+        vlm_prompt=vlm_prompt,
+        force_convert=force_convert,
+    )
+
+@app.task(name="docling.convert_batch")
+def convert_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """批量文档转换
     
-    try:
-        # 获取文档ID
-        if not document_id:
-            content_hash = hashlib.md5(content.encode() if isinstance(content, str) else content).hexdigest()
-            document_id = f"{content_hash}"
-        
-        logger.info(f"开始处理文档 ID: {document_id}, 管道类型: {pipeline}, OCR引擎: {ocr}, VLM图片描述: {enable_vlm_picture_description}")
-        
-        # 使用convert_file预处理 - 这将准备文件并识别格式
-        temp_file_path = None
-        is_temp_file = False
+    复用缓存的转换器，并在转换当前文档的同时预取(下载/解码/图片转PDF)下一个文档。
+    
+    参数:
+        items: 转换参数列表，每项的键与convert的参数相同
+    
+    返回:
+        与items顺序一致的结果列表，每项结构与convert的返回值相同
+    """
+    results = []
+    if not items:
+        return results
+    
+    # 参数无效的项直接返回错误，不影响其余文档
+    item_errors = [_check_batch_item(item) for item in items]
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        def prefetch(index: int) -> Optional[Future]:
+            if item_errors[index] is not None:
+                return None
+            arguments = inspect.signature(_convert_document).bind(**items[index])
+            arguments.apply_defaults()
+            # 后台线程先查询结果缓存，未命中时才下载/解码文件
+            return executor.submit(_prepare_input, arguments.arguments, True)
         
+        pending = prefetch(0)
+        try:
+            for index, item in enumerate(items):
+                prepared = pending
+                pending = prefetch(index + 1) if index + 1 < len(items) else None
+                
+                if item_errors[index] is not None:
+                    results.append(_error_result(item_errors[index], _new_model_info()))
+                    continue
+                
+                results.append(_convert_document(**item, prepared=prepared))
+        finally:
+            # 中途退出时清理已预取但未使用的文件
+            if pending is not None:
+                _discard_prepared(pending)
+    
+    logger.info(f"批量转换完成，共 {len(results)} 个文档")
+    return results
+
+def _convert_document(
+    content: str,
+    content_type: str = "auto",
+    file_type: str = "",
+    document_id: Optional[str] = None,
+    pipeline: Literal["standard", "simple", "vlm"] = "auto",
+    ocr: Optional[str] = None,
+    language: str = "zh",
+    return_base64_images: bool = False,
+    images_scale: float = 2.0,
+    generate_images: Literal["none", "page", "picture", "all"] = "picture",
+    advanced_features: Optional[Dict[str, bool]] = None,
+    output_dir: Optional[str] = None,
+    enable_vlm_picture_description: bool = False,
+    vlm_provider: Optional[str] = None,
+    vlm_model: Optional[str] = None,
+    vlm_prompt: Optional[str] = None,
+    force_convert: bool = False,
+    prepared: Optional[Future] = None,
+) -> Dict[str, Any]:
+    """执行单个文档转换，prepared为已提交的_prepare_input预取任务（批量转换时使用）"""
+    arguments = dict(locals())
+    model_info = _new_model_info(pipeline, ocr, enable_vlm_picture_description)
+    
+    # 使用convert_file预处理 - 这将准备文件并识别格式
+    temp_file_path = None
+    is_temp_file = False
+    
+    try:
         try:
-            temp_file_path, is_temp_file, detected_type, is_converted_from_image = prepare_file(content, content_type, file_type)
+            # 先接管预取的文件，之后任何步骤失败都由finally清理
+            if prepared is not None:
+                content_hash, cache_path, cached_result, prepared_file = prepared.result()
+            else:
+                content_hash, cache_path, cached_result, prepared_file = _prepare_input(arguments, False)
+            if prepared_file is not None:
+                temp_file_path, is_temp_file, detected_type, is_converted_from_image = prepared_file
+            
+            # 获取文档ID
+            if not document_id:
+                document_id = content_hash or compute_document_id(content)
+            
+            logger.info(f"开始处理文档 ID: {document_id}, 管道类型: {pipeline}, OCR引擎: {ocr}, VLM图片描述: {enable_vlm_picture_description}")
+            
+            # 相同内容和参数的转换结果可直接复用
+            if cached_result is not None:
+                logger.info(f"命中转换结果缓存: {cache_path}")
+                cached_result["document_id"] = document_id
+                return cached_result
+            
+            if prepared_file is None:
+                temp_file_path, is_temp_file, detected_type, is_converted_from_image = prepare_file(content, content_type, file_type)
             logger.info(f"文件准备完成: {temp_file_path}, 检测到文件类型: {detected_type}, 是否图片转PDF: {is_converted_from_image}")
             
             # 如果未指定文件类型，使用检测到的类型
             if not file_type and detected_type:
                 file_type = detected_type
             
-            # 根据管道类型配置选项
-            if pipeline in ["standard", "auto"]:
-                # 对于标准和自动模式，创建带有正确选项的PDF转换器
-                pipeline_options = PdfPipelineOptions()
-                pipeline_options.images_scale = images_scale
-                
-                # 根据generate_images设置图像生成选项
-                if generate_images == "none":
-                    pipeline_options.generate_page_images = False
-                    pipeline_options.generate_picture_images = False
-                elif generate_images == "page":
-                    pipeline_options.generate_page_images = True
-                    pipeline_options.generate_picture_images = False
-                elif generate_images == "picture":
-                    pipeline_options.generate_page_images = False
-                    pipeline_options.generate_picture_images = True
-                elif generate_images == "all":
-                    pipeline_options.generate_page_images = True
-                    pipeline_options.generate_picture_images = True
-                
-                # 应用高级特性
-                if advanced_features:
-                    for feature, enabled in advanced_features.items():
-                        if hasattr(pipeline_options, feature):
-                            setattr(pipeline_options, feature, enabled)
-                
-                # 如果启用VLM图片描述功能
-                if enable_vlm_picture_description:
-                    # 启用远程服务和图片描述
-                    pipeline_options.enable_remote_services = True
-                    pipeline_options.do_picture_description = True
-                    
-                    # 从vlm_config获取图片描述API选项
-                    from .vlm_config import get_picture_description_api_options
-                    
-                    # 获取配置选项并应用
-                    api_options = get_picture_description_api_options(
-                        provider=vlm_provider,
-                        model=vlm_model,
-                        prompt=vlm_prompt
-                    )
-                    
-                    # 使用正确的选项
-                    pipeline_options.picture_description_options = api_options
-                    
-                    # 更新模型信息
-                    vlm_provider = vlm_provider or os.environ.get("VLM_PROVIDER", "ollama")
-                    vlm_model = vlm_model or os.environ.get("VLM_MODEL_NAME", "")
-                    
-                    # 如果模型名为空，获取默认值
-                    if not vlm_model:
-                        vlm_model = get_default_vlm_model(vlm_provider)
-                    
-                    model_info["vlm_provider"] = vlm_provider
-                    model_info["vlm_model"] = vlm_model
-                    logger.info(f"启用VLM图片描述，提供商: {model_info['vlm_provider']}, 模型: {model_info['vlm_model']}")
-                            
-                # 对于图片转换的PDF，如果没有指定OCR引擎，自动使用rapid
-                if not ocr and is_converted_from_image:
-                    logger.info(f"检测到图片转换的PDF，未指定OCR引擎，自动使用rapid引擎")
-                    ocr = "rapid"
-                    model_info["ocr_engine"] = ocr
-                
-                # 直接使用配置好的选项创建新的转换器
-                logger.info(f"创建PDF转换器，OCR引擎: {ocr}, 语言: {language}")
-                converter = get_pdf_converter(
-                    ocr=ocr, 
-                    language=language, 
-                    pipeline_options=pipeline_options
-                )
-                model_info["ocr_engine"] = ocr or "默认"
-                model_info["pipeline"] = "standard"
-                
-            elif pipeline == "simple":
-                ext = Path(temp_file_path).suffix.lower()[1:] if Path(temp_file_path).suffix else file_type
-                
-                if ext == "pdf":
-                    logger.info("检测到PDF文件，使用PyPDF2快速转换")
-                    # 使用PyPDF2快速转换
-                    res = get_fast_pdf_converter(temp_file_path)
-                    model_info["pipeline"] = "simple_pdf"
-                else:
-                    # 原有的simple转换逻辑
-                    if file_type:
-                        logger.info(f"创建Simple转换器，文件类型: {file_type}")
-                        converter = get_simple_converter(file_type)
-                    else:
-                        logger.info("创建默认Simple转换器")
-                        converter = get_simple_converter()
-                    
-                    model_info["pipeline"] = "simple"
-                    res = converter.convert(temp_file_path)
-            
-            elif pipeline == "vlm":
-                logger.info("创建VLM转换器")
-                # 获取环境变量中的提供商和模型信息
-                provider = os.environ.get("VLM_PROVIDER", "ollama")
-                model = os.environ.get("VLM_MODEL_NAME", "")
-                
-                # 更新：如果model为空，获取默认值
-                if not model:
-                    model = get_default_vlm_model(provider)
-                
-                logger.info(f"使用VLM服务，提供商: {provider}, 模型: {model}")
-                
-                converter = get_vlm_converter(
-                    provider=provider,
-                    model=model,
-                    prompt=None,
-                    api_key=None
-                )
-                
-                model_info["pipeline"] = "vlm"
-                model_info["provider"] = provider
-                model_info["model"] = model
-                
-            else:
-                # 自动检测
-                ext = Path(temp_file_path).suffix.lower()[1:] if Path(temp_file_path).suffix else file_type
-                if ext == "pdf" or is_converted_from_image:  # 使用标志而不是列举扩展名
-                    logger.info(f"自动检测为PDF文件，创建PDF转换器")
-                    # 对于图片转换的PDF，如果没有指定OCR引擎，自动使用rapid
-                    if not ocr and is_converted_from_image:
-                        logger.info(f"检测到图片转换的PDF，未指定OCR引擎，自动使用rapid引擎")
-                        ocr = "rapid"
-                        model_info["ocr_engine"] = ocr
-                        
-                    converter = get_pdf_converter(ocr=ocr, language=language)
-                    model_info["pipeline"] = "standard"
-                    model_info["ocr_engine"] = ocr or "默认"
-                else:
-                    logger.info(f"自动检测为其他格式，创建Simple转换器")
-                    converter = get_simple_converter(ext)
-                    model_info["pipeline"] = "simple"
+            # 根据管道类型选择转换方式，每个分支只执行一次转换
+            res = _run_pipeline(
+                pipeline,
+                temp_file_path,
+                file_type,
+                is_converted_from_image,
+                model_info,
+                ocr=ocr,
+                language=language,
+                return_base64_images=return_base64_images,
+                images_scale=images_scale,
+                generate_images=generate_images,
+                advanced_features=advanced_features,
+                enable_vlm_picture_description=enable_vlm_picture_description,
+                vlm_provider=vlm_provider,
+                vlm_model=vlm_model,
+                vlm_prompt=vlm_prompt,
+            )
             
-            # 执行转换
-            logger.info(f"开始文档转换: {temp_file_path}")
-            start_time = time.time()
-            res = converter.convert(temp_file_path)
-            conversion_time = time.time() - start_time
-            logger.info(f"文档转换完成，耗时: {conversion_time:.2f}秒")
+            # 输出文件名和路径只解析一次，供Markdown和图片输出共用
+            doc_filename = Path(res.input.file).stem
+            artifacts_name = f"{doc_filename}_artifacts"
+            output_path = Path(output_dir) if output_dir else None
             
             # 处理结果
             result = {
@@ -248,76 +313,74 @@ def convert(
                 "model_info": model_info
             }
             
-            # 如果是PyPDF2快速转换的结果
+            # 如果是PDFium快速转换的结果
             if hasattr(res, 'text') and model_info["pipeline"] == "simple_pdf":
                 result["markdown_content"] = res.text
                 
                 # 如果需要输出到文件
-                if output_dir:
-                    output_path = Path(output_dir)
-                    output_path.mkdir(parents=True, exist_ok=True)
-                    doc_filename = Path(res.input.file).stem
-                    md_filename = output_path / f"{doc_filename}.md"
-                    logger.info(f"保存快速提取的文本到文件: {md_filename}")
-                    with open(md_filename, "w", encoding="utf-8") as f:
-                        f.write(res.text)
-                    result["output_file"] = str(md_filename)
+                result["output_file"] = _write_markdown_output(output_path, doc_filename, res.text)
             else:
                 # 标准或VLM处理结果
+                from docling_core.types.doc import ImageRefMode, PictureItem
+                
                 markdown_content = res.document.export_to_markdown(image_mode=ImageRefMode.REFERENCED)
                 result["markdown_content"] = markdown_content
                 
                 # 检查并处理图片信息
                 pic_count = 0
-                doc_filename = Path(res.input.file).stem
+                
+                # 输出到目录且需要返回base64数据时，图片同时保存到文件系统
+                artifacts_dir = None
+                if output_path is not None and not output_path.suffix and return_base64_images:
+                    artifacts_dir = output_path / artifacts_name
+                
+                # 所有图片复用同一个PNG编码缓冲区
+                png_buffer = io.BytesIO()
+                # 本次已创建的图片目录，同一目录只创建一次
+                ensured_dirs = set()
+                log_pictures = logger.isEnabledFor(logging.DEBUG)
 
                 for element, _level in res.document.iterate_items():
                     if isinstance(element, PictureItem):
                         pic_count += 1
                         ref_id = element.self_ref
                         caption = element.caption_text(doc=res.document)
-                        has_annotations = hasattr(element, "annotations") and element.annotations
+                        has_annotations = bool(element.annotations)
                         
-                        # 记录日志
-                        logger.info(f"图片 {ref_id} - 标题: {caption}")
-                        if has_annotations:
-                            logger.info(f"图片注释: {element.annotations}")
-                        else:
-                            logger.info(f"图片没有注释")
+                        # 逐图日志只在DEBUG级别输出，避免格式化注释等大对象
+                        if log_pictures:
+                            logger.debug(f"图片 {ref_id} - 标题: {caption}")
+                            if has_annotations:
+                                logger.debug(f"图片注释: {element.annotations}")
+                            else:
+                                logger.debug(f"图片没有注释")
                         
                         # 无论是否需要base64数据，都添加到返回结果中
                         image_info = {
                             "filename": f"{ref_id}.png",
-                            "ref_path": f"{doc_filename}_artifacts/{ref_id}.png",
+                            "ref_path": f"{artifacts_name}/{ref_id}.png",
                             "caption": caption
                         }
                         
                         # 如果有图片注释，则返回
                         if has_annotations:
-                            # 将PictureDescriptionData对象转换为可序列化的字典
-                            if hasattr(element.annotations, '__dict__'):
-                                # 如果是对象类型，转换为字典
-                                annotations_dict = {}
-                                for key, value in element.annotations.__dict__.items():
-                                    if key.startswith('_'):  # 跳过私有属性
-                                        continue
-                                    if hasattr(value, '__dict__'):
-                                        annotations_dict[key] = str(value)  # 复杂对象转为字符串
-                                    else:
-                                        annotations_dict[key] = value
-                                image_info["annotations"] = annotations_dict
-                            else:
-                                # 如果是其他类型，转为字符串
-                                image_info["annotations"] = str(element.annotations)
+                            image_info["annotations"] = _dump_annotations(element.annotations)
                         
                         # 只有在需要时才提取并返回base64数据
                         if return_base64_images:
                             try:
                                 image = element.get_image(res.document)
-                                with io.BytesIO() as buffer:
-                                    image.save(buffer, format="PNG")
-                                    img_bytes = buffer.getvalue()
-                                    image_info["base64"] = base64.b64encode(img_bytes).decode("utf-8")
+                                img_bytes = _encode_png(image, png_buffer)
+                                image_info["base64"] = base64.b64encode(img_bytes).decode("utf-8")
+                                
+                                # 直接写入PNG原始字节，无需再从base64解码
+                                if artifacts_dir is not None:
+                                    # 使用标准化的文件名
+                                    img_path = artifacts_dir / image_info["filename"]
+                                    if img_path.parent not in ensured_dirs:
+                                        img_path.parent.mkdir(parents=True, exist_ok=True)
+                                        ensured_dirs.add(img_path.parent)
+                                    img_path.write_bytes(img_bytes)
                             except Exception as e:
                                 logger.warning(f"提取图片失败: {e}")
                         
@@ -327,113 +390,613 @@ def convert(
                 logger.info(f"文档中共包含 {pic_count} 个图片项目")
                 
                 # 如果要输出到文件
-                if output_dir:
-                    output_path = Path(output_dir)
-                    # 判断是文件还是目录
-                    if output_path.suffix:  # 有后缀名，当作文件处理
-                        output_path.parent.mkdir(parents=True, exist_ok=True)
-                        logger.info(f"保存Markdown到文件: {output_path}")
-                        with open(output_path, "w", encoding="utf-8") as f:
-                            f.write(markdown_content)
-                        result["output_file"] = str(output_path)
-                    else:  # 无后缀，当作目录处理
-                        output_path.mkdir(parents=True, exist_ok=True)
-                        doc_filename = Path(res.input.file).stem
-                        md_filename = output_path / f"{doc_filename}.md"
-                        logger.info(f"保存Markdown到文件: {md_filename}")
-                        with open(md_filename, "w", encoding="utf-8") as f:
-                            f.write(markdown_content)
-                        result["output_file"] = str(md_filename)
-                        
-                        # 如果有图片并且需要返回base64数据，保存到文件系统
-                        if return_base64_images and result["images"]:
-                            artifacts_dir = output_path / f"{doc_filename}_artifacts"
-                            artifacts_dir.mkdir(exist_ok=True)
-                            for ref_id, image_info in result["images"].items():
-                                if "base64" in image_info:
-                                    # 使用标准化的文件名
-                                    img_path = artifacts_dir / image_info["filename"]
-                                    with open(img_path, "wb") as f:
-                                        f.write(base64.b64decode(image_info["base64"]))
+                result["output_file"] = _write_markdown_output(output_path, doc_filename, markdown_content)
             
             logger.info(f"处理完成，文档ID: {document_id}")
             
+            if cache_path:
+                _save_cached_result(cache_path, result)
+            
             return result
         
         finally:
             # 只删除临时创建的文件
-            if temp_file_path and os.path.exists(temp_file_path) and is_temp_file:
+            if is_temp_file and temp_file_path:
                 logger.debug(f"清理临时文件: {temp_file_path}")
-                os.unlink(temp_file_path)
+                with contextlib.suppress(OSError):
+                    os.unlink(temp_file_path)
 
     except Exception as e:
         logger.exception(f"文档转换失败: {str(e)}")
-        import traceback
-        return {
-            "error": True,
-            "message": str(e),
-            "error_type": type(e).__name__,
-            "traceback": traceback.format_exc(),
-            "model_info": model_info  # 在错误情况下也返回模型信息
-        }
+        return _error_result(e, model_info)
 
-def get_pdf_converter(ocr: Optional[str] = None, language: str = "zh", 
-                     pipeline_options: Optional[PdfPipelineOptions] = None) -> DocumentConverter:
-    """获取PDF处理转换器"""
-    # 如果没有提供选项，创建默认选项
-    if pipeline_options is None:
+def _new_model_info(pipeline: str = "auto", ocr: Optional[str] = None, enable_vlm_picture_description: bool = False) -> Dict[str, Any]:
+    """创建返回结果中的模型信息"""
+    return {
+        "pipeline": pipeline,
+        "provider": None,
+        "model": None,
+        "ocr_engine": ocr,
+        "vlm_enabled": enable_vlm_picture_description,
+    }
+
+def _error_result(e: Exception, model_info: Dict[str, Any]) -> Dict[str, Any]:
+    """构造转换失败时的返回结果"""
+    return {
+        "error": True,
+        "message": str(e),
+        "error_type": type(e).__name__,
+        "traceback": "".join(traceback.TracebackException.from_exception(e).format()),
+        "model_info": model_info  # 在错误情况下也返回模型信息
+    }
+
+def _check_batch_item(item) -> Optional[Exception]:
+    """检查批量转换项的参数，无效时返回对应异常"""
+    if not isinstance(item, dict):
+        return TypeError(f"批量转换项必须是字典，实际为: {type(item).__name__}")
+    if "content" not in item:
+        return ValueError("批量转换项缺少content参数")
+    allowed = inspect.signature(_convert_document).parameters.keys() - {"prepared"}
+    unknown = sorted(item.keys() - allowed)
+    if unknown:
+        return TypeError(f"批量转换项包含未知参数: {', '.join(map(str, unknown))}")
+    return None
+
+def _prepare_input(arguments: Dict[str, Any], fetch: bool) -> tuple:
+    """查询转换结果缓存，未命中且fetch为True时同时准备输入文件
+    
+    Returns:
+        (内容哈希, 缓存路径, 缓存的结果, prepare_file的返回值)，未启用缓存或未准备文件时对应项为None
+    """
+    content = arguments["content"]
+    content_hash = None
+    cache_path = None
+    cached_result = None
+    cache_dir = _get_result_cache_dir(content, arguments["content_type"], arguments["return_base64_images"])
+    if cache_dir:
+        content_hash = compute_document_id(content)
+        cache_path = _get_result_cache_path(
+            cache_dir, content, content_hash, {key: arguments[key] for key in _CACHE_OPTION_KEYS}
+        )
+        # 强制转换时跳过读取缓存，转换完成后刷新缓存
+        if not arguments["force_convert"]:
+            cached_result = _load_cached_result(cache_path)
+    
+    prepared_file = None
+    if fetch and cached_result is None:
+        prepared_file = prepare_file(content, arguments["content_type"], arguments["file_type"])
+    return content_hash, cache_path, cached_result, prepared_file
+
+def _discard_prepared(prepared: Optional[Future]) -> None:
+    """清理未被使用的预取文件"""
+    if prepared is None:
+        return
+    try:
+        prepared_file = prepared.result()[3]
+    except Exception:
+        return
+    if prepared_file is not None:
+        temp_file_path, is_temp_file, _, _ = prepared_file
+        if is_temp_file:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_file_path)
+
+def compute_document_id(content) -> str:
+    """根据文档内容计算文档ID（32位十六进制，优先使用blake3）
+    
+    字符串按块编码后增量哈希，避免为大体积Base64内容生成完整的字节副本。
+    """
+    hasher = blake3.blake3() if blake3 is not None else hashlib.blake2b(digest_size=16)
+    if isinstance(content, str):
+        for start in range(0, len(content), _HASH_CHUNK_SIZE):
+            hasher.update(content[start:start + _HASH_CHUNK_SIZE].encode())
+    else:
+        hasher.update(content)
+    if blake3 is not None:
+        return hasher.hexdigest(length=16)
+    return hasher.hexdigest()
+
+def _run_pipeline(
+    pipeline: str,
+    temp_file_path: str,
+    file_type: str,
+    is_converted_from_image: bool,
+    model_info: Dict[str, Any],
+    ocr: Optional[str] = None,
+    language: str = "zh",
+    return_base64_images: bool = False,
+    images_scale: float = 2.0,
+    generate_images: str = "picture",
+    advanced_features: Optional[Dict[str, bool]] = None,
+    enable_vlm_picture_description: bool = False,
+    vlm_provider: Optional[str] = None,
+    vlm_model: Optional[str] = None,
+    vlm_prompt: Optional[str] = None,
+):
+    """根据管道类型选择转换方式并执行一次转换，同时更新model_info"""
+    ext = Path(temp_file_path).suffix.lower()[1:] if Path(temp_file_path).suffix else file_type
+    
+    # 快速转换不支持OCR、图片提取、图片描述和高级特性，请求了这些功能时仍走标准管道
+    if (
+        pipeline == "auto"
+        and os.environ.get("OCULITH_AUTO_FAST_PDF") == "1"
+        and not ocr
+        and not return_base64_images
+        and not enable_vlm_picture_description
+        and not advanced_features
+        and ext == "pdf"
+        and not is_converted_from_image
+        and _pdf_has_extractable_text(temp_file_path)
+    ):
+        # 数字原生PDF已包含可提取文本，无需走OCR和版面分析的标准管道
+        logger.info("检测到PDF包含可提取文本，自动使用快速转换")
+        model_info["pipeline"] = "simple_pdf"
+        return get_fast_pdf_converter(temp_file_path)
+    
+    if pipeline in ["standard", "auto"]:
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        
+        # 对于标准和自动模式，创建带有正确选项的PDF转换器
         pipeline_options = PdfPipelineOptions()
-        pipeline_options.images_scale = 2.0
-        pipeline_options.generate_page_images = True
-        pipeline_options.generate_picture_images = True  # 启用图像提取
+        pipeline_options.images_scale = images_scale
+        
+        # 根据generate_images设置图像生成选项
+        if generate_images in _GENERATE_IMAGES_OPTIONS:
+            (
+                pipeline_options.generate_page_images,
+                pipeline_options.generate_picture_images,
+            ) = _GENERATE_IMAGES_OPTIONS[generate_images]
+        
+        # 应用高级特性
+        if advanced_features:
+            for feature, enabled in advanced_features.items():
+                if hasattr(pipeline_options, feature):
+                    setattr(pipeline_options, feature, enabled)
+        
+        # 如果启用VLM图片描述功能
+        description_options = None
+        if enable_vlm_picture_description:
+            # docling会在convert内部逐张串行请求VLM，这里改为转换后统一并发描述；
+            # 描述需要裁剪好的图片，因此强制生成图片，描述完成后按调用方设置决定是否保留
+            keep_picture_images = pipeline_options.generate_picture_images
+            pipeline_options.generate_picture_images = True
+            
+            # 从vlm_config获取图片描述API选项
+            from .vlm_config import get_picture_description_api_options
+            
+            description_options = get_picture_description_api_options(
+                provider=vlm_provider,
+                model=vlm_model,
+                prompt=vlm_prompt
+            )
+            
+            # 更新模型信息
+            vlm_env = _vlm_env()
+            vlm_provider = vlm_provider or vlm_env["VLM_PROVIDER"] or "ollama"
+            vlm_model = vlm_model or vlm_env["VLM_MODEL_NAME"]
+            
+            # 如果模型名为空，获取默认值
+            if not vlm_model:
+                vlm_model = get_default_vlm_model(vlm_provider)
+            
+            model_info["vlm_provider"] = vlm_provider
+            model_info["vlm_model"] = vlm_model
+            logger.info(f"启用VLM图片描述，提供商: {model_info['vlm_provider']}, 模型: {model_info['vlm_model']}")
+                    
+        # 对于图片转换的PDF，如果没有指定OCR引擎，自动使用rapid
+        if not ocr and is_converted_from_image:
+            logger.info(f"检测到图片转换的PDF，未指定OCR引擎，自动使用rapid引擎")
+            ocr = "rapid"
+        
+        # 选项完全由以下参数决定，用作转换器缓存键（含不可哈希的高级特性时退回序列化选项）
+        options_key = (
+            images_scale,
+            generate_images,
+            enable_vlm_picture_description,
+            tuple(sorted(advanced_features.items())) if advanced_features else (),
+        )
+        try:
+            hash(options_key)
+        except TypeError:
+            options_key = None
+        
+        # 直接使用配置好的选项创建新的转换器
+        logger.info(f"创建PDF转换器，OCR引擎: {ocr}, 语言: {language}")
+        converter = get_pdf_converter(
+            ocr=ocr, 
+            language=language, 
+            pipeline_options=pipeline_options,
+            options_key=options_key,
+        )
+        model_info["ocr_engine"] = _ocr_engine_info(ocr, language, pipeline_options.do_ocr)
+        model_info["pipeline"] = "standard"
+        res = _convert_with(converter, temp_file_path)
+        if description_options is not None:
+            _describe_pictures(res.document, description_options)
+            if not keep_picture_images:
+                _drop_picture_images(res.document)
+        return res
     
-    # 如果指定OCR，配置OCR选项
-    if ocr:
-        pipeline_options.do_ocr = True
+    if pipeline == "simple":
+        if ext == "pdf":
+            logger.info("检测到PDF文件，使用PDFium快速转换")
+            # 使用PDFium快速转换
+            model_info["pipeline"] = "simple_pdf"
+            return get_fast_pdf_converter(temp_file_path)
         
-        # 配置OCR选项
-        if ocr == "rapid":
-            ocr_options = RapidOcrOptions(force_full_page_ocr=True)
-        elif ocr == "mac":
-            lang_codes = ["zh-Hans"] if language == "zh" else [language]
-            ocr_options = OcrMacOptions(lang=lang_codes, force_full_page_ocr=True)
-        elif ocr == "tesseract":
-            lang_codes = ["chi_sim"] if language == "zh" else [language]
-            ocr_options = TesseractCliOcrOptions(lang=lang_codes, force_full_page_ocr=True)
-        elif ocr == "easy":
-            lang_codes = ["ch_sim"] if language == "zh" else [language]
-            ocr_options = EasyOcrOptions(lang=lang_codes, force_full_page_ocr=True)
+        # 原有的simple转换逻辑
+        if file_type:
+            logger.info(f"创建Simple转换器，文件类型: {file_type}")
+            converter = get_simple_converter(file_type)
         else:
-            # 默认使用RapidOCR
-            ocr_options = RapidOcrOptions(force_full_page_ocr=True)
+            logger.info("创建默认Simple转换器")
+            converter = get_simple_converter()
+        
+        model_info["pipeline"] = "simple"
+        return _convert_with(converter, temp_file_path)
+    
+    if pipeline == "vlm":
+        logger.info("创建VLM转换器")
+        # 获取环境变量中的提供商和模型信息
+        vlm_env = _vlm_env()
+        provider = vlm_env["VLM_PROVIDER"] or "ollama"
+        model = vlm_env["VLM_MODEL_NAME"]
+        
+        # 更新：如果model为空，获取默认值
+        if not model:
+            model = get_default_vlm_model(provider)
+        
+        logger.info(f"使用VLM服务，提供商: {provider}, 模型: {model}")
+        
+        converter = get_vlm_converter(
+            provider=provider,
+            model=model,
+            prompt=None,
+            api_key=None
+        )
+        
+        model_info["pipeline"] = "vlm"
+        model_info["provider"] = provider
+        model_info["model"] = model
+        return _convert_with(converter, temp_file_path)
+    
+    # 自动检测
+    if ext == "pdf" or is_converted_from_image:  # 使用标志而不是列举扩展名
+        logger.info(f"自动检测为PDF文件，创建PDF转换器")
+        # 对于图片转换的PDF，如果没有指定OCR引擎，自动使用rapid
+        if not ocr and is_converted_from_image:
+            logger.info(f"检测到图片转换的PDF，未指定OCR引擎，自动使用rapid引擎")
+            ocr = "rapid"
             
-        pipeline_options.ocr_options = ocr_options
-    
-    return DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(
-                pipeline_options=pipeline_options,
-            ),
-            InputFormat.IMAGE: PdfFormatOption(
-                pipeline_options=pipeline_options,
-            ),
+        converter = get_pdf_converter(ocr=ocr, language=language)
+        model_info["pipeline"] = "standard"
+        model_info["ocr_engine"] = _ocr_engine_info(ocr, language)
+    else:
+        logger.info(f"自动检测为其他格式，创建Simple转换器")
+        converter = get_simple_converter(ext)
+        model_info["pipeline"] = "simple"
+    return _convert_with(converter, temp_file_path)
+
+def _convert_with(converter: DocumentConverter, temp_file_path: str):
+    """使用docling转换器执行转换并记录耗时"""
+    logger.info(f"开始文档转换: {temp_file_path}")
+    start_time = time.monotonic()
+    res = converter.convert(temp_file_path)
+    conversion_time = time.monotonic() - start_time
+    logger.info(f"文档转换完成，耗时: {conversion_time:.2f}秒")
+    return res
+
+def _describe_pictures(document, api_options, max_concurrency: int = _VLM_DESCRIPTION_CONCURRENCY) -> int:
+    """并发请求VLM接口为文档中的图片生成描述，结果追加到图片的annotations中
+    
+    请求格式与docling的API图片描述模型一致（OpenAI兼容的chat completions），
+    与docling相同，占页面面积比例低于picture_area_threshold的图片不生成描述。
+    
+    Returns:
+        成功生成描述的图片数量
+    """
+    import requests
+    from docling_core.types.doc import PictureItem
+    from docling_core.types.doc.document import PictureDescriptionData
+    
+    def large_enough(picture) -> bool:
+        if not picture.prov:
+            return True
+        prov = picture.prov[0]
+        page = document.pages.get(prov.page_no)
+        if page is None:
+            return True
+        page_area = page.size.width * page.size.height
+        return page_area <= 0 or prov.bbox.area() / page_area >= api_options.picture_area_threshold
+    
+    pictures = [
+        element for element, _level in document.iterate_items()
+        if isinstance(element, PictureItem) and large_enough(element)
+    ]
+    if not pictures:
+        return 0
+    
+    url = str(api_options.url)
+    provenance = api_options.params.get("model", "")
+    
+    def describe(picture) -> Optional[str]:
+        image = picture.get_image(document)
+        if image is None:
+            return None
+        # 并发线程各自使用独立的缓冲区
+        image_base64 = base64.b64encode(_encode_png(image, io.BytesIO())).decode("utf-8")
+        payload = {
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
+                    {"type": "text", "text": api_options.prompt},
+                ],
+            }],
+            **api_options.params,
         }
+        try:
+            response = requests.post(url, headers=api_options.headers, json=payload, timeout=api_options.timeout)
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"].strip()
+        except Exception as e:
+            logger.warning(f"图片描述请求失败: {picture.self_ref}, {e}")
+            return None
+    
+    logger.info(f"开始并发生成图片描述，图片数: {len(pictures)}, 并发数: {max_concurrency}")
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pictures)))) as executor:
+        descriptions = list(executor.map(describe, pictures))
+    
+    described = 0
+    for picture, text in zip(pictures, descriptions):
+        if text:
+            picture.annotations.append(PictureDescriptionData(text=text, provenance=provenance))
+            described += 1
+    logger.info(f"图片描述完成: {described}/{len(pictures)}，耗时: {time.monotonic() - start_time:.2f}秒")
+    return described
+
+def _drop_picture_images(document) -> None:
+    """移除为生成描述而裁剪的图片数据，使输出与调用方的generate_images设置一致"""
+    from docling_core.types.doc import PictureItem
+    
+    for element, _level in document.iterate_items():
+        if isinstance(element, PictureItem):
+            element.image = None
+
+def _encode_png(image, buffer: io.BytesIO) -> bytes:
+    """将图片编码为PNG字节，复用传入的缓冲区，使用低压缩级别加快编码"""
+    buffer.seek(0)
+    buffer.truncate()
+    image.save(buffer, format="PNG", compress_level=_PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+def _dump_annotations(annotations):
+    """将图片注释（PictureDescriptionData等pydantic模型的列表）转换为可序列化的结构"""
+    if isinstance(annotations, list):
+        return [_dump_annotations(annotation) for annotation in annotations]
+    if isinstance(annotations, BaseModel):
+        return annotations.model_dump(mode="json")
+    if dataclasses.is_dataclass(annotations):
+        return dataclasses.asdict(annotations)
+    return str(annotations)
+
+def _dump_json_bytes(obj, sort_keys: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节，安装了orjson时直接由orjson输出字节"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, default=str).encode("utf-8")
+
+def _get_result_cache_dir(content, content_type: str, return_base64_images: bool) -> Optional[str]:
+    """获取转换结果缓存目录，未配置OCULITH_CACHE_DIR、需要返回base64图片或输入为URL时不缓存
+    
+    URL指向的远程文档可能随时变化，按URL字符串缓存会一直返回旧结果
+    """
+    cache_dir = os.environ.get("OCULITH_CACHE_DIR")
+    if not cache_dir or return_base64_images:
+        return None
+    if content_type == "url" or (
+        content_type == "auto" and isinstance(content, str) and content.startswith(("http://", "https://"))
+    ):
+        return None
+    return cache_dir
+
+def _get_result_cache_path(cache_dir: str, content, content_hash: str, options: Dict[str, Any]) -> Path:
+    """获取转换结果缓存文件路径"""
+    key_parts = {"content": content_hash, **options}
+    # 影响转换结果的环境变量也要纳入缓存键
+    key_parts["auto_fast_pdf"] = os.environ.get("OCULITH_AUTO_FAST_PDF")
+    if options.get("pipeline") == "vlm" or options.get("enable_vlm_picture_description"):
+        # 只有用到VLM的转换受VLM配置影响；直接读取环境变量，不为此导入vlm_config
+        key_parts["vlm_env"] = {key: value for key, value in os.environ.items() if key.startswith("VLM_")}
+    # 本地文件按路径哈希，需要附加修改时间和大小以识别文件变化
+    if isinstance(content, str) and os.path.isfile(content):
+        stat = os.stat(content)
+        key_parts["file_stat"] = [stat.st_mtime_ns, stat.st_size]
+    key_bytes = _dump_json_bytes(key_parts, sort_keys=True)
+    return Path(cache_dir) / f"{hashlib.blake2b(key_bytes, digest_size=16).hexdigest()}.json"
+
+def _load_cached_result(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """读取缓存的转换结果，输出文件已不存在时视为未命中"""
+    try:
+        data = cache_path.read_bytes()
+        cached = orjson.loads(data) if orjson is not None else json.loads(data)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict):
+        return None
+    if cached.get("output_file") and not os.path.exists(cached["output_file"]):
+        return None
+    return cached
+
+@functools.lru_cache(maxsize=1)
+def _get_umask() -> int:
+    """获取进程的umask（只能通过设置再恢复的方式读取，因此只读取一次）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+def _save_cached_result(cache_path: Path, result: Dict[str, Any]) -> None:
+    """保存转换结果到缓存（先写临时文件再替换，避免读到不完整的缓存）
+    
+    临时文件名唯一，多个worker同时写入同一缓存项时互不覆盖，最后一次替换生效。
+    """
+    tmp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=f"{cache_path.stem}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dump_json_bytes(result))
+        # mkstemp创建的文件权限为0600，改为普通文件的默认权限，其他用户的worker也能读取
+        os.chmod(tmp_path, 0o666 & ~_get_umask())
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"保存转换结果缓存失败: {e}")
+        if tmp_path:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+def _write_markdown_output(output_path: Optional[Path], doc_filename: str, markdown_content: str) -> Optional[str]:
+    """保存Markdown到输出路径（有后缀名当作文件，否则当作目录），返回文件路径"""
+    if output_path is None:
+        return None
+    
+    if output_path.suffix:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        md_filename = output_path
+    else:
+        output_path.mkdir(parents=True, exist_ok=True)
+        md_filename = output_path / f"{doc_filename}.md"
+    
+    logger.info(f"保存Markdown到文件: {md_filename}")
+    md_filename.write_bytes(markdown_content.encode("utf-8"))
+    return str(md_filename)
+
+def _get_cached_converter(key: tuple, factory) -> DocumentConverter:
+    """按配置复用转换器，避免每次任务都重新加载OCR/版面模型
+    
+    创建转换器时也持有锁，同一配置不会被并发重复创建。
+    返回的转换器由进程内所有任务共用，worker须使用prefork进程池。
+    """
+    with _CONVERTER_CACHE_LOCK:
+        converter = _CONVERTER_CACHE.get(key)
+        if converter is None:
+            converter = factory()
+            if len(_CONVERTER_CACHE) >= _CONVERTER_CACHE_SIZE:
+                # 淘汰最久未使用的转换器
+                _CONVERTER_CACHE.popitem(last=False)
+            _CONVERTER_CACHE[key] = converter
+        else:
+            _CONVERTER_CACHE.move_to_end(key)
+        return converter
+
+def get_pdf_converter(ocr: Optional[str] = None, language: str = "zh", 
+                     pipeline_options: Optional[PdfPipelineOptions] = None,
+                     options_key: Optional[tuple] = None) -> DocumentConverter:
+    """获取PDF处理转换器
+    
+    options_key为能唯一确定pipeline_options的参数元组，提供时直接用作缓存键，
+    无需每次序列化整个选项对象；未提供时退回按选项的JSON序列化结果缓存。
+    """
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    
+    def configure_options() -> PdfPipelineOptions:
+        options = pipeline_options
+        # 如果没有提供选项，创建默认选项
+        if options is None:
+            options = PdfPipelineOptions()
+            options.images_scale = 2.0
+            options.generate_page_images = True
+            options.generate_picture_images = True  # 启用图像提取
+        
+        # 如果指定OCR，配置OCR选项
+        if ocr:
+            options.do_ocr = True
+            options.ocr_options = get_ocr_options(ocr, language)
+        elif language == "zh" and options.do_ocr:
+            # docling默认的EasyOCR不识别中文，自动选择中文OCR引擎（仅识别位图区域）
+            options.ocr_options = get_ocr_options(
+                get_default_ocr_engine(language), language, force_full_page_ocr=False
+            )
+        return options
+    
+    def create_converter(options: PdfPipelineOptions) -> DocumentConverter:
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(
+                    pipeline_options=options,
+                ),
+                InputFormat.IMAGE: PdfFormatOption(
+                    pipeline_options=options,
+                ),
+            }
+        )
+    
+    if pipeline_options is None:
+        options_key = ("default",)
+    
+    if options_key is not None:
+        # 缓存命中时无需构建默认选项和OCR选项
+        return _get_cached_converter(
+            ("pdf", ocr, language, options_key),
+            lambda: create_converter(configure_options())
+        )
+    
+    options = configure_options()
+    return _get_cached_converter(
+        ("pdf", options.model_dump_json()),
+        lambda: create_converter(options)
     )
 
-def get_simple_converter(input_format: Optional[InputFormat] = None) -> DocumentConverter:
-    """获取SimplePipeline处理其他格式的转换器"""
-    # 支持的所有格式
-    allowed_formats = [
+def get_ocr_options(ocr: str, language: str = "zh", force_full_page_ocr: bool = True):
+    """根据OCR引擎名称创建OCR选项"""
+    from docling.datamodel.pipeline_options import (
+        RapidOcrOptions, TesseractCliOcrOptions, OcrMacOptions, EasyOcrOptions
+    )
+    
+    if ocr == "rapid":
+        return RapidOcrOptions(force_full_page_ocr=force_full_page_ocr)
+    elif ocr == "mac":
+        lang_codes = ["zh-Hans"] if language == "zh" else [language]
+        return OcrMacOptions(lang=lang_codes, force_full_page_ocr=force_full_page_ocr)
+    elif ocr == "tesseract":
+        lang_codes = ["chi_sim"] if language == "zh" else [language]
+        return TesseractCliOcrOptions(lang=lang_codes, force_full_page_ocr=force_full_page_ocr)
+    elif ocr == "easy":
+        lang_codes = ["ch_sim"] if language == "zh" else [language]
+        return EasyOcrOptions(lang=lang_codes, force_full_page_ocr=force_full_page_ocr)
+    else:
+        # 默认使用RapidOCR
+        return RapidOcrOptions(force_full_page_ocr=force_full_page_ocr)
+
+@functools.lru_cache(maxsize=1)
+def _simple_input_formats() -> Dict[str, InputFormat]:
+    """SimplePipeline支持的所有格式：格式值 -> InputFormat（首次使用时计算一次）"""
+    from docling.datamodel.base_models import InputFormat
+    
+    formats = (
         InputFormat.DOCX, InputFormat.HTML, InputFormat.PPTX,
         InputFormat.MD, InputFormat.CSV, InputFormat.XLSX,
         InputFormat.ASCIIDOC
-    ]
+    )
+    return {fmt.value: fmt for fmt in formats}
+
+def get_simple_converter(input_format: Optional[Union[InputFormat, str]] = None) -> DocumentConverter:
+    """获取SimplePipeline处理其他格式的转换器"""
+    from docling.document_converter import DocumentConverter
     
-    # 如果指定了具体格式，只允许该格式
-    if input_format and input_format in allowed_formats:
-        allowed_formats = [input_format]
+    supported = _simple_input_formats()
     
-    return DocumentConverter(allowed_formats=allowed_formats)
+    # 如果指定了支持的具体格式，只允许该格式（文件扩展名和InputFormat都归一为同一个缓存键）
+    fmt = supported.get(getattr(input_format, "value", input_format)) if input_format else None
+    allowed_formats = (fmt,) if fmt is not None else tuple(supported.values())
+    
+    return _get_cached_converter(
+        ("simple", allowed_formats),
+        lambda: DocumentConverter(allowed_formats=list(allowed_formats))
+    )
 
 def get_vlm_converter(
     provider: str = None, 
@@ -442,40 +1005,50 @@ def get_vlm_converter(
     api_key: str = None
 ) -> DocumentConverter:
     """获取基于视觉语言模型的转换器"""
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.pipeline.vlm_pipeline import VlmPipeline
     from .vlm_config import get_vlm_pipeline_options
     
     # 从环境变量读取缺失值，默认使用ollama
-    provider = provider or os.environ.get("VLM_PROVIDER", "ollama")
-    model = model or os.environ.get("VLM_MODEL_NAME", "")
-    prompt = prompt or os.environ.get("VLM_PROMPT", "")
-    api_key = api_key or os.environ.get("VLM_API_KEY", "")
+    vlm_env = _vlm_env()
+    provider = provider or vlm_env["VLM_PROVIDER"] or "ollama"
+    model = model or vlm_env["VLM_MODEL_NAME"]
+    prompt = prompt or vlm_env["VLM_PROMPT"]
+    api_key = api_key or vlm_env["VLM_API_KEY"]
     
     logger.info(f"配置VLM转换器 - 提供商: {provider}, 模型: {model or '默认'}")
     
-    vlm_options = get_vlm_pipeline_options(
-        provider=provider,
-        model=model,
-        prompt=prompt,
-        api_key=api_key
-    )
+    def create_converter() -> DocumentConverter:
+        # 其余配置（如推理框架）来自进程内不变的环境变量，选项仅在缓存未命中时构建
+        vlm_options = get_vlm_pipeline_options(
+            provider=provider,
+            model=model,
+            prompt=prompt,
+            api_key=api_key
+        )
+        
+        logger.info(f"VLM选项已配置, 是否使用远程服务: {vlm_options.enable_remote_services}")
+        
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(
+                    pipeline_options=vlm_options,
+                    pipeline_cls=VlmPipeline,
+                ),
+                InputFormat.IMAGE: PdfFormatOption(
+                    pipeline_options=vlm_options,
+                    pipeline_cls=VlmPipeline,
+                ),
+            }
+        )
     
-    logger.info(f"VLM选项已配置, 是否使用远程服务: {vlm_options.enable_remote_services}")
-    
-    return DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(
-                pipeline_options=vlm_options,
-                pipeline_cls=VlmPipeline,
-            ),
-            InputFormat.IMAGE: PdfFormatOption(
-                pipeline_options=vlm_options,
-                pipeline_cls=VlmPipeline,
-            ),
-        }
-    )
+    return _get_cached_converter(("vlm", provider, model, prompt, api_key), create_converter)
 
 def extract_images_with_markdown(conv_res, output_dir=None):
     """提取文档中的插图、描述和Markdown内容"""
+    from docling_core.types.doc import ImageRefMode, PictureItem
+    
     result = {
         "markdown_content": "",
         "images": {},
@@ -484,77 +1057,122 @@ def extract_images_with_markdown(conv_res, output_dir=None):
     
     doc_filename = Path(conv_res.input.file).stem
     
-    # 提取图片描述
+    # 单次遍历文档：收集图片描述，不保存到本地时同时提取图片
+    # （循环内使用局部变量，避免重复的全局/属性查找）
+    extract_images = not output_dir
+    b64encode = base64.b64encode
+    png_buffer = io.BytesIO()
+    images = result["images"]
+    picture_descriptions = result["picture_descriptions"]
+    has_pictures = False
     for element, _level in conv_res.document.iterate_items():
-        if isinstance(element, PictureItem) and hasattr(element, "annotations") and element.annotations:
+        if not isinstance(element, PictureItem):
+            continue
+        has_pictures = True
+        
+        if element.annotations:
             # 使用图片引用ID作为键
-            ref_id = element.self_ref
-            result["picture_descriptions"][ref_id] = {
+            picture_descriptions[element.self_ref] = {
                 "caption": element.caption_text(doc=conv_res.document),
                 "annotations": element.annotations
             }
+        
+        if extract_images:
+            try:
+                image = element.get_image(conv_res.document)
+                img_id = hash(str(image))
+                img_name = f"image_{img_id}.png"
+                
+                images[img_name] = b64encode(_encode_png(image, png_buffer)).decode("utf-8")
+            except Exception as e:
+                logger.warning(f"提取图片失败: {e}")
     
     # 如果需要保存到本地
     if output_dir:
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # 使用官方方法直接保存Markdown和图片
         md_filename = output_dir / f"{doc_filename}.md"
-        conv_res.document.save_as_markdown(md_filename, image_mode=ImageRefMode.REFERENCED)
-        
-        # 读取生成的Markdown
-        with open(md_filename, "r", encoding="utf-8") as f:
-            result["markdown_content"] = f.read()
+        if has_pictures:
+            # 使用官方方法保存Markdown和图片（图片引用会改写为artifacts目录下的路径）
+            conv_res.document.save_as_markdown(md_filename, image_mode=ImageRefMode.REFERENCED)
+            
+            # 读取生成的Markdown
+            with open(md_filename, "r", encoding="utf-8") as f:
+                result["markdown_content"] = f.read()
+        else:
+            # 没有图片时导出结果与保存内容一致，直接写入，无需再读回
+            result["markdown_content"] = conv_res.document.export_to_markdown(image_mode=ImageRefMode.REFERENCED)
+            md_filename.write_bytes(result["markdown_content"].encode("utf-8"))
             
         # 提取并收集图片信息
         artifacts_dir = output_dir / f"{doc_filename}_artifacts"
-        if artifacts_dir.exists():
-            for img_path in artifacts_dir.glob("*.png"):
-                with open(img_path, "rb") as f:
-                    img_bytes = f.read()
-                    img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-                    result["images"][img_path.name] = img_b64
+        # scandir的目录项自带类型信息，无需为每个文件单独stat；目录不存在即没有图片
+        try:
+            entries = os.scandir(artifacts_dir)
+        except FileNotFoundError:
+            entries = None
+        if entries is not None:
+            with entries:
+                for entry in entries:
+                    if entry.name.endswith(".png") and entry.is_file():
+                        with open(entry.path, "rb") as f:
+                            result["images"][entry.name] = base64.b64encode(f.read()).decode("utf-8")
     else:
         # 直接使用export_to_markdown方法
         result["markdown_content"] = conv_res.document.export_to_markdown(image_mode=ImageRefMode.REFERENCED)
-            
-        # 手动提取图片
-        try:
-            for element, _level in conv_res.document.iterate_items():
-                if isinstance(element, PictureItem):
-                    try:
-                        image = element.get_image(conv_res.document)
-                        img_id = hash(str(image))
-                        img_name = f"image_{img_id}.png"
-                        
-                        with io.BytesIO() as buffer:
-                            image.save(buffer, format="PNG")
-                            img_bytes = buffer.getvalue()
-                            img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-                            result["images"][img_name] = img_b64
-                    except Exception as e:
-                        logger.warning(f"提取图片失败: {e}")
-        except Exception as e:
-            logger.debug(f"提取图片过程中遇到异常 (可能是不支持图像的格式): {e}")
     
     return result
 
-def extract_with_pypdf2(pdf_path):
-    """使用PyPDF2快速提取PDF文本"""
-    start_time = time.time()
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n\n"
-    end_time = time.time()
+def _pdf_has_extractable_text(pdf_path, min_chars: int = 100, max_pages: int = 3) -> bool:
+    """探测PDF前几页是否包含足够的可提取文本（即非扫描件）"""
+    import pypdfium2 as pdfium
+    
+    try:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            total_chars = 0
+            for page_text in _iter_pages_text(pdf, 0, min(max_pages, len(pdf))):
+                total_chars += len(page_text.strip())
+                if total_chars >= min_chars:
+                    return True
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.debug(f"PDF文本探测失败: {e}")
+    return False
+
+def _iter_pages_text(pdf, start: int, stop: int):
+    """逐页提取已打开的PDFium文档中指定页范围的文本"""
+    for index in range(start, stop):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        try:
+            yield textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+def extract_with_pdfium(pdf_path):
+    """使用PDFium快速提取PDF文本"""
+    import pypdfium2 as pdfium
+    
+    start_time = time.monotonic()
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page_texts = list(_iter_pages_text(pdf, 0, len(pdf)))
+    finally:
+        pdf.close()
+    # 每页文本后跟一个空行，列表拼接避免字符串反复累加
+    text = "".join(f"{page_text}\n\n" for page_text in page_texts)
+    end_time = time.monotonic()
     return text, end_time - start_time
 
 def get_fast_pdf_converter(input_file):
-    """获取基于PyPDF2的快速PDF转换器"""
+    """获取基于PDFium的快速PDF转换器"""
     try:
-        text, conversion_time = extract_with_pypdf2(input_file)
-        logger.info(f"PyPDF2提取完成，耗时: {conversion_time:.2f}秒")
+        text, conversion_time = extract_with_pdfium(input_file)
+        logger.info(f"PDFium提取完成，耗时: {conversion_time:.2f}秒")
         
         # 创建一个类似于Docling转换结果的简单对象
         class SimpleConversionResult:
@@ -567,27 +1185,54 @@ def get_fast_pdf_converter(input_file):
                 return self.text
                 
             def save_as_markdown(self, path, image_mode=None):
-                with open(path, "w", encoding="utf-8") as f:
-                    f.write(self.text)
+                Path(path).write_bytes(self.text.encode("utf-8"))
         
         return SimpleConversionResult(text, input_file)
     except Exception as e:
-        logger.exception(f"PyPDF2快速提取失败: {str(e)}")
+        logger.exception(f"PDFium快速提取失败: {str(e)}")
         raise
 
+@functools.lru_cache(maxsize=8)
+def _tesseract_has_lang(lang: str) -> bool:
+    """检查本机tesseract是否安装了指定语言包（docling调用tesseract时缺少语言包会直接失败）"""
+    tesseract = shutil.which("tesseract")
+    if not tesseract:
+        return False
+    try:
+        proc = subprocess.run(
+            [tesseract, "--list-langs"], capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"查询tesseract语言包失败: {e}")
+        return False
+    # 旧版本tesseract把语言列表输出到stderr
+    langs = (proc.stdout + proc.stderr).split()
+    return lang in langs
+
+def _ocr_engine_info(ocr: Optional[str], language: str, do_ocr: bool = True) -> Optional[str]:
+    """返回model_info中记录的OCR引擎，指定引擎时get_pdf_converter会强制开启OCR，未执行OCR时为None"""
+    if ocr:
+        return ocr
+    if not do_ocr:
+        return None
+    return get_default_ocr_engine(language) if language == "zh" else "默认"
+
 # 获取OCR引擎的真实默认值（在获取PDF转换器之前）
-def get_default_ocr_engine():
-    """获取默认OCR引擎名称"""
-    return "rapid"  # 或者根据实际情况返回
+# 结果只取决于语言和本机环境，缓存后转换器配置和model_info不再重复探测
+@functools.lru_cache(maxsize=8)
+def get_default_ocr_engine(language: str = "zh") -> str:
+    """获取默认OCR引擎名称：中文优先使用已安装中文语言包的tesseract，否则使用rapid"""
+    if language == "zh" and _tesseract_has_lang("chi_sim"):
+        return "tesseract"
+    return "rapid"
 
 # 获取VLM模型的真实默认值
+@functools.lru_cache(maxsize=1)
+def _vlm_env() -> Dict[str, str]:
+    """读取VLM相关环境变量，worker进程内只读取一次"""
+    from . import vlm_config  # noqa: F401  导入时会把.env加载到环境变量
+    return {key: os.environ.get(key, "") for key in _VLM_ENV_KEYS}
+
 def get_default_vlm_model(provider):
     """根据提供商获取默认VLM模型名称"""
-    if provider == "ollama":
-        return "granite3.2-vision:2b"
-    elif provider == "dashscope":
-        return "qwen-vl-plus"
-    elif provider == "openai":
-        return "gpt-4o"
-    else:
-        return "HuggingFaceTB/SmolVLM-256M-Instruct"
+    return _VLM_DEFAULT_MODELS.get(provider, "HuggingFaceTB/SmolVLM-256M-Instruct")
@@ -1,9 +1,9 @@
 import os
+import functools
 import mimetypes
 import logging
 import tempfile
 from pathlib import Path
-from PIL import Image
 from typing import Tuple, Optional
 
 logger = logging.getLogger(__name__)
@@ -47,14 +47,15 @@ def detect_file_type(file_path: str) -> str:
     if ext:
         return ext
     
-    # 尝试通过mime类型判断
+    # 尝试通过文件内容的mime类型判断
     try:
-        import magic  # 如果安装了python-magic
-        mime = magic.Magic(mime=True).from_file(file_path)
-        if mime in MIME_TO_TYPE:
-            return MIME_TO_TYPE[mime]
-    except (ImportError, Exception) as e:
-        logger.debug(f"使用magic检测文件类型失败: {e}")
+        stat = os.stat(file_path)
+    except OSError as e:
+        logger.debug(f"读取文件信息失败: {e}")
+    else:
+        file_type = _sniff_file_type(file_path, stat.st_mtime_ns, stat.st_size)
+        if file_type:
+            return file_type
     
     # 退回到mimetypes
     mime, _ = mimetypes.guess_type(file_path)
@@ -64,6 +65,22 @@ def detect_file_type(file_path: str) -> str:
     # 如果都失败了，返回空字符串
     return ""
 
+@functools.lru_cache(maxsize=256)
+def _sniff_file_type(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    通过文件内容嗅探文件类型
+    
+    按(路径, 修改时间, 大小)缓存，同一文件重复提交（如重试）时不再重复读取文件头；
+    文件被修改后修改时间或大小变化，会重新检测。
+    """
+    try:
+        import magic  # 如果安装了python-magic
+        mime = magic.Magic(mime=True).from_file(file_path)
+        return MIME_TO_TYPE.get(mime, "")
+    except (ImportError, Exception) as e:
+        logger.debug(f"使用magic检测文件类型失败: {e}")
+        return ""
+
 def is_image_file(file_type: str) -> bool:
     """判断是否为图片文件类型"""
     return file_type.lower() in IMAGE_EXTENSIONS
@@ -78,6 +95,8 @@ def convert_image_to_pdf(image_path: str) -> Tuple[str, bool]:
     返回:
         (pdf文件路径, 是临时文件)
     """
+    from PIL import Image
+    
     try:
         # 打开图片
         img = Image.open(image_path)
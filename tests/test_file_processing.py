@@ -239,7 +239,7 @@ def test_other_formats_pipeline_selection(mock_pdf_converter, mock_simple_conver
     # 测试simple pipeline
     result = convert('content', 'file', 'docx', pipeline='simple')
     mock_simple_converter.assert_called_once()
-    assert mock_simple_converter_instance.convert.call_count == 2
+    mock_simple_converter_instance.convert.assert_called_once()
     assert result['model_info']['pipeline'] == 'simple'
     
     # 重置所有mock
@@ -255,3 +255,297 @@ def test_other_formats_pipeline_selection(mock_pdf_converter, mock_simple_conver
     mock_pdf_converter.assert_called_once()  # 期望调用PDF转换器
     assert mock_pdf_converter_instance.convert.call_count >= 1
     assert result['model_info']['pipeline'] == 'standard'  # 实际pipeline是standard
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_ocr_engine_info_without_ocr(mock_pdf_converter, mock_prepare):
+    """测试高级特性关闭OCR时model_info不报告OCR引擎"""
+    mock_prepare.return_value = ('/tmp/test.pdf', False, 'pdf', False)
+    _setup_pdf_converter(mock_pdf_converter)
+    
+    result = convert('content', 'file', 'pdf', pipeline='standard', advanced_features={'do_ocr': False})
+    assert result['model_info']['ocr_engine'] is None
+    
+    result = convert('content', 'file', 'pdf', pipeline='standard', ocr='rapid', advanced_features={'do_ocr': False})
+    assert result['model_info']['ocr_engine'] == 'rapid'
+
+
+# -----自动快速PDF转换测试-----
+TEXT_PDF = Path('tests/data/pdf/2305.03393v1-pg9.pdf')
+SCANNED_PDF = Path('tests/data/pdf/beian_img.pdf')
+
+
+@pytest.fixture
+def auto_fast_pdf(monkeypatch):
+    """启用auto管道的快速PDF转换"""
+    monkeypatch.setenv('OCULITH_AUTO_FAST_PDF', '1')
+    monkeypatch.delenv('OCULITH_CACHE_DIR', raising=False)
+
+
+@patch('oculith.convert.get_pdf_converter')
+def test_auto_fast_pdf_text_pdf(mock_pdf_converter, auto_fast_pdf):
+    """测试包含可提取文本的PDF使用快速转换"""
+    result = convert(str(TEXT_PDF), 'file', 'pdf', pipeline='auto')
+    
+    assert result['model_info']['pipeline'] == 'simple_pdf'
+    assert result['markdown_content'].strip() != ''
+    mock_pdf_converter.assert_not_called()
+
+
+@patch('oculith.convert.get_pdf_converter')
+def test_auto_fast_pdf_scanned_pdf(mock_pdf_converter, auto_fast_pdf):
+    """测试没有可提取文本的PDF仍走标准管道"""
+    _setup_pdf_converter(mock_pdf_converter)
+    
+    result = convert(str(SCANNED_PDF), 'file', 'pdf', pipeline='auto')
+    
+    assert result['model_info']['pipeline'] == 'standard'
+    mock_pdf_converter.assert_called_once()
+
+
+@pytest.mark.parametrize('options', [
+    {'ocr': 'rapid'},
+    {'return_base64_images': True},
+    {'enable_vlm_picture_description': True},
+    {'advanced_features': {'do_table_structure': True}},
+])
+@patch('oculith.convert.get_pdf_converter')
+def test_auto_fast_pdf_fallback(mock_pdf_converter, auto_fast_pdf, options):
+    """测试请求了快速转换不支持的功能时走标准管道"""
+    _setup_pdf_converter(mock_pdf_converter)
+    
+    with patch('oculith.vlm_config.get_picture_description_api_options'), \
+         patch('oculith.convert._describe_pictures'):
+        result = convert(str(TEXT_PDF), 'file', 'pdf', pipeline='auto', **options)
+    
+    assert result['model_info']['pipeline'] == 'standard'
+    mock_pdf_converter.assert_called_once()
+
+
+@patch('oculith.convert.get_pdf_converter')
+def test_auto_fast_pdf_disabled(mock_pdf_converter, monkeypatch):
+    """测试未启用OCULITH_AUTO_FAST_PDF时auto管道走标准管道"""
+    monkeypatch.delenv('OCULITH_AUTO_FAST_PDF', raising=False)
+    monkeypatch.delenv('OCULITH_CACHE_DIR', raising=False)
+    _setup_pdf_converter(mock_pdf_converter)
+    
+    result = convert(str(TEXT_PDF), 'file', 'pdf', pipeline='auto')
+    
+    assert result['model_info']['pipeline'] == 'standard'
+    mock_pdf_converter.assert_called_once()
+
+# -----转换结果缓存测试-----
+def _setup_pdf_converter(mock_pdf_converter):
+    """模拟PDF转换器，返回转换器实例以便统计调用次数"""
+    mock_converter = MagicMock()
+    mock_result = MagicMock()
+    mock_result.input.file = '/tmp/test.pdf'
+    mock_result.document.export_to_markdown.return_value = "pdf markdown content"
+    mock_result.document.iterate_items.return_value = []
+    mock_converter.convert.return_value = mock_result
+    mock_pdf_converter.return_value = mock_converter
+    return mock_converter
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """启用转换结果缓存"""
+    path = tmp_path / 'cache'
+    monkeypatch.setenv('OCULITH_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def pdf_file(tmp_path):
+    """创建本地PDF文件"""
+    path = tmp_path / 'test.pdf'
+    path.write_bytes(b'%PDF-1.4 test content')
+    return path
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_hit(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试相同内容和参数时直接返回缓存结果"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    first = convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    second = convert(str(pdf_file), 'file', 'pdf', pipeline='standard', document_id='doc-2')
+    
+    assert mock_converter.convert.call_count == 1
+    assert mock_prepare.call_count == 1
+    assert second['markdown_content'] == first['markdown_content'] == "pdf markdown content"
+    assert second['document_id'] == 'doc-2'
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_miss(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试转换参数不同时不命中缓存"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard', ocr='rapid')
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard', ocr='easy')
+    
+    assert mock_converter.convert.call_count == 2
+    assert len(list(cache_dir.glob('*.json'))) == 2
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_stale_file(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试本地文件修改后重新转换"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    pdf_file.write_bytes(b'%PDF-1.4 modified test content')
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    
+    assert mock_converter.convert.call_count == 2
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_force_convert(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试force_convert跳过缓存"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard', force_convert=True)
+    assert mock_converter.convert.call_count == 2
+    
+    # 强制转换的结果会刷新缓存，之后的请求仍可命中
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    assert mock_converter.convert.call_count == 2
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_invalid_entry(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试缓存文件内容不是字典时视为未命中"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    for cache_file in cache_dir.glob('*.json'):
+        cache_file.write_text('[1, 2, 3]')
+    result = convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    
+    assert 'error' not in result
+    assert mock_converter.convert.call_count == 2
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_ignores_vlm_env(mock_pdf_converter, mock_prepare, cache_dir, pdf_file, monkeypatch):
+    """测试未使用VLM的转换不受VLM配置变化影响"""
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    monkeypatch.setenv('VLM_API_KEY', 'key-1')
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    monkeypatch.setenv('VLM_API_KEY', 'key-2')
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    
+    assert mock_converter.convert.call_count == 1
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_result_cache_skips_url(mock_pdf_converter, mock_prepare, cache_dir):
+    """测试URL输入不缓存，远程文档可能已变化"""
+    mock_prepare.return_value = ('/tmp/test.pdf', True, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    with patch('oculith.convert.os.unlink'):
+        convert('https://example.com/test.pdf', 'url', 'pdf', pipeline='standard')
+        convert('https://example.com/test.pdf', 'url', 'pdf', pipeline='standard')
+    
+    assert mock_converter.convert.call_count == 2
+    assert not cache_dir.exists() or not list(cache_dir.glob('*.json'))
+
+
+# -----批量转换测试-----
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_convert_batch_invalid_item(mock_pdf_converter, mock_prepare, tmp_path):
+    """测试批量转换中参数无效的项返回错误，不影响其余文档"""
+    from oculith.convert import convert_batch
+    
+    def prepare(content, content_type, file_type):
+        temp_path = tmp_path / f'{content}.pdf'
+        temp_path.write_bytes(b'%PDF-1.4')
+        return (str(temp_path), True, 'pdf', False)
+    mock_prepare.side_effect = prepare
+    _setup_pdf_converter(mock_pdf_converter)
+    
+    results = convert_batch([
+        {'content': 'a', 'pipeline': 'standard'},
+        {'content': 'b', 'unknown_option': True},
+        {'pipeline': 'standard'},
+        {'content': 'c', 'prepared': None},
+        {'content': 'd', 'pipeline': 'standard'},
+    ])
+    
+    assert len(results) == 5
+    assert results[0]['markdown_content'] == "pdf markdown content"
+    assert results[1]['error'] is True and results[1]['error_type'] == 'TypeError'
+    assert results[2]['error'] is True and results[2]['error_type'] == 'ValueError'
+    assert results[3]['error'] is True and results[3]['error_type'] == 'TypeError'
+    assert 'model_info' in results[1]
+    assert results[4]['markdown_content'] == "pdf markdown content"
+    # 无效项不预取，有效项的临时文件全部清理
+    assert mock_prepare.call_count == 2
+    assert not list(tmp_path.glob('*.pdf'))
+
+
+@patch('oculith.convert._run_pipeline')
+@patch('oculith.convert.prepare_file')
+def test_convert_batch_cleans_prefetched_file_on_error(mock_prepare, mock_run_pipeline, tmp_path):
+    """测试批量转换中单项转换失败时清理其预取的临时文件"""
+    from oculith.convert import convert_batch
+    
+    def prepare(content, content_type, file_type):
+        temp_path = tmp_path / f'{content}.pdf'
+        temp_path.write_bytes(b'%PDF-1.4')
+        return (str(temp_path), True, 'pdf', False)
+    mock_prepare.side_effect = prepare
+    mock_run_pipeline.side_effect = RuntimeError("转换失败")
+    
+    results = convert_batch([
+        {'content': 'a', 'pipeline': 'standard'},
+        {'content': 'b', 'pipeline': 'standard'},
+    ])
+    
+    assert [r['error_type'] for r in results] == ['RuntimeError', 'RuntimeError']
+    assert mock_prepare.call_count == 2
+    assert not list(tmp_path.glob('*.pdf'))
+
+
+@patch('oculith.convert.prepare_file')
+@patch('oculith.convert.get_pdf_converter')
+def test_convert_batch_cache_hit_skips_prefetch(mock_pdf_converter, mock_prepare, cache_dir, pdf_file):
+    """测试批量转换中命中缓存的项不再预取文件"""
+    from oculith.convert import convert_batch
+    
+    mock_prepare.return_value = (str(pdf_file), False, 'pdf', False)
+    mock_converter = _setup_pdf_converter(mock_pdf_converter)
+    
+    convert(str(pdf_file), 'file', 'pdf', pipeline='standard')
+    assert mock_prepare.call_count == 1
+    
+    results = convert_batch([
+        {'content': str(pdf_file), 'content_type': 'file', 'file_type': 'pdf', 'pipeline': 'standard'},
+        {'content': str(pdf_file), 'content_type': 'file', 'file_type': 'pdf', 'pipeline': 'standard'},
+    ])
+    
+    assert [r['markdown_content'] for r in results] == ["pdf markdown content"] * 2
+    assert mock_prepare.call_count == 1
+    assert mock_converter.convert.call_count == 1
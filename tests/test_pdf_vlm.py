@@ -1,7 +1,11 @@
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
 
-from oculith.convert import convert
+from PIL import Image
+
+from oculith.convert import convert, _describe_pictures, _drop_picture_images, _env_positive_int
 
 # 测试数据
 TEST_PDF_FILES = [
@@ -60,3 +64,101 @@ def test_vlm_output_to_file():
             assert content.strip() != ""
     except Exception as e:
         pytest.skip(f"VLM输出测试失败: {e}")
+
+
+# -----图片描述测试-----
+class _FakeBBox:
+    def __init__(self, area):
+        self._area = area
+
+    def area(self):
+        return self._area
+
+
+class _FakePicture:
+    """模拟docling的PictureItem，位于100x100的第1页"""
+    def __init__(self, ref, area):
+        self.self_ref = ref
+        self.annotations = []
+        self.image = "picture image"
+        self.prov = [SimpleNamespace(page_no=1, bbox=_FakeBBox(area))]
+
+    def get_image(self, doc):
+        return Image.new("RGB", (8, 8))
+
+
+class _FakeDocument:
+    def __init__(self, pictures):
+        self.pictures = pictures
+        self.pages = {1: SimpleNamespace(size=SimpleNamespace(width=100, height=100))}
+
+    def iterate_items(self):
+        return [(picture, 0) for picture in self.pictures]
+
+
+def _api_options():
+    return SimpleNamespace(
+        url="http://vlm.test/v1/chat/completions",
+        params={"model": "test-model"},
+        headers={},
+        prompt="描述这个图像的内容。",
+        timeout=10,
+        picture_area_threshold=0.05,
+    )
+
+
+def _vlm_response(text):
+    response = MagicMock()
+    response.json.return_value = {"choices": [{"message": {"content": text}}]}
+    return response
+
+
+@patch('requests.post')
+def test_describe_pictures_area_threshold(mock_post):
+    """测试占页面面积比例低于阈值的图片不生成描述"""
+    mock_post.return_value = _vlm_response(" 一张图表 ")
+    small = _FakePicture("#/pictures/0", area=100)   # 占页面1%
+    large = _FakePicture("#/pictures/1", area=5000)  # 占页面50%
+    
+    with patch('docling_core.types.doc.PictureItem', _FakePicture):
+        described = _describe_pictures(_FakeDocument([small, large]), _api_options())
+    
+    assert described == 1
+    assert mock_post.call_count == 1
+    assert small.annotations == []
+    assert large.annotations[0].text == "一张图表"
+    assert large.annotations[0].provenance == "test-model"
+
+
+@patch('requests.post')
+def test_describe_pictures_failed_request(mock_post):
+    """测试VLM请求失败的图片跳过，不影响整个转换"""
+    failed = MagicMock()
+    failed.raise_for_status.side_effect = RuntimeError("500 Server Error")
+    mock_post.return_value = failed
+    picture = _FakePicture("#/pictures/0", area=5000)
+    
+    with patch('docling_core.types.doc.PictureItem', _FakePicture):
+        described = _describe_pictures(_FakeDocument([picture]), _api_options())
+    
+    assert described == 0
+    assert picture.annotations == []
+
+
+def test_drop_picture_images():
+    """测试移除为生成描述而裁剪的图片数据"""
+    pictures = [_FakePicture(f"#/pictures/{i}", area=5000) for i in range(2)]
+    
+    with patch('docling_core.types.doc.PictureItem', _FakePicture):
+        _drop_picture_images(_FakeDocument(pictures))
+    
+    assert [picture.image for picture in pictures] == [None, None]
+
+
+def test_vlm_concurrency_env(monkeypatch):
+    """测试并发数环境变量取值无效时使用默认值"""
+    monkeypatch.setenv("OCULITH_VLM_CONCURRENCY", "4")
+    assert _env_positive_int("OCULITH_VLM_CONCURRENCY", 10) == 4
+    for value in ("0", "-1", "abc"):
+        monkeypatch.setenv("OCULITH_VLM_CONCURRENCY", value)
+        assert _env_positive_int("OCULITH_VLM_CONCURRENCY", 10) == 10